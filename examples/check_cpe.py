@@ -23,7 +23,7 @@ for _host in rep.hosts:
 
         if _host.os_fingerprinted:
             print("  OS Fingerprints")
-            for osm in _host.os.osmatches:
+            for osm in _host.os.osmatches():
                 print("    Found Match:{0} ({1}%)".format(osm.name,
                                                           osm.accuracy))
                 # NmapOSMatch.get_cpe() method return an array of string
@@ -12,7 +12,7 @@ for _host in rep.hosts:
         if _host.os_fingerprinted:
             print("OS Fingerprint:")
             msg = ''
-            for osm in _host.os.osmatches:
+            for osm in _host.os.osmatches():
                 print("Found Match:{0} ({1}%)".format(osm.name, osm.accuracy))
                 for osc in osm.osclasses:
                     print("\tOS Class: {0}".format(osc.description))
@@ -9,6 +9,8 @@ class CPE(object):
 
         :todo: interpret CPE string and provide appropriate API
     """
+    __slots__ = ('_cpestring', '_cpedict')
+
     def __init__(self, cpestring):
         self._cpestring = cpestring
         zk = ['cpe', 'part', 'vendor', 'product', 'version',
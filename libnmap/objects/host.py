@@ -309,7 +309,7 @@ class NmapHost(object):
         """
         rval = []
         if self.os is not None:
-            rval = self.os.osmatches
+            rval = self.os.osmatches()
         return rval
 
     @property
@@ -2,6 +2,12 @@
 
 import warnings
 from libnmap.objects.cpe import CPE
+try:
+    from sys import intern
+except ImportError:
+    # python 2: the intern() builtin does not accept unicode strings
+    def intern(string):
+        return string
 
 
 class OSFPPortUsed(object):
@@ -59,28 +65,21 @@ class NmapOSMatch(object):
 
         More info, see issue #26 or http://seclists.org/nmap-dev/2012/q2/252
     """
+    __slots__ = ('_name', '_line', '_accuracy', '_osclasses')
+
     def __init__(self, osmatch_dict):
         _osmatch_dict = osmatch_dict['osmatch']
         if('name' not in _osmatch_dict or
            'line' not in _osmatch_dict or
            'accuracy' not in _osmatch_dict):
-            raise Exception("Cannot create NmapOSClass: missing required key")
+            raise Exception("Cannot create NmapOSMatch: missing required key")
 
-        self._name = _osmatch_dict['name']
-        self._line = _osmatch_dict['line']
-        self._accuracy = _osmatch_dict['accuracy']
+        self._name = intern(_osmatch_dict['name'])
+        self._line = int(_osmatch_dict['line'])
+        self._accuracy = int(_osmatch_dict['accuracy'])
 
-        # create osclass list
-        self._osclasses = []
-        try:
-            for _osclass in osmatch_dict['osclasses']:
-                try:
-                    _osclassobj = NmapOSClass(_osclass)
-                except:
-                    raise Exception("Could not create NmapOSClass object")
-                self._osclasses.append(_osclassobj)
-        except KeyError:
-            pass
+        self._osclasses = [NmapOSClass(_osclass) for _osclass
+                           in osmatch_dict.get('osclasses', ())]
 
     def add_osclass(self, osclass_obj):
 
@@ -114,7 +113,7 @@ class NmapOSMatch(object):
 
             :return: int
         """
-        return int(self._line)
+        return self._line
 
     @property
     def accuracy(self):
@@ -123,7 +122,7 @@ class NmapOSMatch(object):
 
             :return: int
         """
-        return int(self._accuracy)
+        return self._accuracy
 
     def get_cpe(self):
         """
@@ -136,15 +135,14 @@ class NmapOSMatch(object):
         """
         _cpelist = []
         for osc in self.osclasses:
-            for cpe in osc.cpelist:
-                _cpelist.append(cpe.cpestring)
+            _cpelist.extend(cpe.cpestring for cpe in osc.cpelist)
         return _cpelist
 
     def __repr__(self):
-        rval = "{0}: {1}".format(self.name, self.accuracy)
-        for _osclass in self._osclasses:
-            rval += "\r\n  |__ os class: {0}".format(str(_osclass))
-        return rval
+        rval = ["{0}: {1}".format(self._name, self._accuracy)]
+        rval.extend("  |__ os class: {0}".format(_osclass)
+                    for _osclass in self._osclasses)
+        return "\r\n".join(rval)
 
 
 class NmapOSClass(object):
@@ -157,6 +155,9 @@ class NmapOSClass(object):
         On top of this, NmapOSClass will have optional CPE objects
         embedded.
     """
+    __slots__ = ('_vendor', '_osfamily', '_accuracy', '_osgen', '_type',
+                 '_cpelist')
+
     def __init__(self, osclass_dict):
         _osclass = osclass_dict['osclass']
         if('vendor' not in _osclass or
@@ -164,21 +165,19 @@ class NmapOSClass(object):
            'accuracy' not in _osclass):
             raise Exception("Wrong osclass structure: missing required key")
 
-        self._vendor = _osclass['vendor']
-        self._osfamily = _osclass['osfamily']
-        self._accuracy = _osclass['accuracy']
+        self._vendor = intern(_osclass['vendor'])
+        self._osfamily = intern(_osclass['osfamily'])
+        self._accuracy = int(_osclass['accuracy'])
 
         self._osgen = ''
         self._type = ''
         # optional data
         if 'osgen' in _osclass:
-            self._osgen = _osclass['osgen']
+            self._osgen = intern(_osclass['osgen'])
         if 'type' in _osclass:
-            self._type = _osclass['type']
+            self._type = intern(_osclass['type'])
 
-        self._cpelist = []
-        for _cpe in osclass_dict['cpe']:
-            self._cpelist.append(CPE(_cpe))
+        self._cpelist = [CPE(_cpe) for _cpe in osclass_dict.get('cpe', ())]
 
     @property
     def cpelist(self):
@@ -215,7 +214,7 @@ class NmapOSClass(object):
 
             :return: int
         """
-        return int(self._accuracy)
+        return self._accuracy
 
     @property
     def osgen(self):
@@ -243,18 +242,16 @@ class NmapOSClass(object):
 
             :return: string
         """
-        rval = "{0}: {1}, {2}".format(self.type, self.vendor, self.osfamily)
-        if len(self.osgen):
-            rval += "({0})".format(self.osgen)
-        return rval
+        if self._osgen:
+            return "{0}: {1}, {2}({3})".format(self._type, self._vendor,
+                                               self._osfamily, self._osgen)
+        return "{0}: {1}, {2}".format(self._type, self._vendor,
+                                      self._osfamily)
 
     def __repr__(self):
-        rval = "{0}: {1}, {2}".format(self.type, self.vendor, self.osfamily)
-        if len(self.osgen):
-            rval += "({0})".format(self.osgen)
-        for _cpe in self._cpelist:
-            rval += "\r\n    |__ {0}".format(str(_cpe))
-        return rval
+        rval = [self.description]
+        rval.extend("    |__ {0}".format(_cpe) for _cpe in self._cpelist)
+        return "\r\n".join(rval)
 
 
 class NmapOSFingerprint(object):
@@ -263,6 +260,10 @@ class NmapOSFingerprint(object):
         Data for OS fingerprint (<os> tag) is instanciated from
         a NmapOSFingerprint which is accessible in NmapHost via NmapHost.os
     """
+    __slots__ = ('_NmapOSFingerprint__osmatches',
+                 '_NmapOSFingerprint__ports_used',
+                 '_NmapOSFingerprint__fingerprints')
+
     def __init__(self, osfp_data):
         self.__osmatches = []
         self.__ports_used = []
@@ -270,16 +271,25 @@ class NmapOSFingerprint(object):
 
         if 'osmatches' in osfp_data:
             for _osmatch in osfp_data['osmatches']:
-                _osmatch_obj = NmapOSMatch(_osmatch)
-                self.__osmatches.append(_osmatch_obj)
+                self.__osmatches.append(NmapOSMatch(_osmatch))
         if 'osclasses' in osfp_data:
+            # index osmatches by accuracy so that each osclass is matched
+            # without scanning all the osmatches: first osmatch seen wins
+            _osmatch_by_acc = {}
+            for _osmatch in self.__osmatches:
+                _osmatch_by_acc.setdefault(_osmatch.accuracy, _osmatch)
             for _osclass in osfp_data['osclasses']:
                 _osclass_obj = NmapOSClass(_osclass)
-                _osmatched = self.get_osmatch(_osclass_obj)
+                _osmatched = _osmatch_by_acc.get(_osclass_obj.accuracy)
                 if _osmatched is not None:
                     _osmatched.add_osclass(_osclass_obj)
                 else:
-                    self._add_dummy_osmatch(_osclass_obj)
+                    _osmatch_by_acc[_osclass_obj.accuracy] = \
+                        self._add_dummy_osmatch(_osclass_obj)
+        # NmapHost builds an empty NmapOSFingerprint for every host without
+        # OS data: keep that path free of any sorting work
+        if len(self.__osmatches) > 1:
+            self.__sort_osmatches()
         if 'osfingerprints' in osfp_data:
             for _osfp in osfp_data['osfingerprints']:
                 if 'fingerprint' in _osfp:
@@ -289,6 +299,19 @@ class NmapOSFingerprint(object):
                 _pused = OSFPPortUsed(_pused_dict)
                 self.__ports_used.append(_pused)
 
+    def __sort_osmatches(self):
+        # keep osmatches sorted by descending accuracy so that accuracy
+        # filters can stop at the first osmatch below the threshold.
+        # nmap already reports osmatches in that order, so only sort when
+        # needed. list.sort() is stable: osmatches with the same accuracy
+        # keep their original order.
+        _osmatches = self.__osmatches
+        for _index in range(1, len(_osmatches)):
+            if _osmatches[_index - 1].accuracy < _osmatches[_index].accuracy:
+                _osmatches.sort(key=lambda _osmatch: _osmatch.accuracy,
+                                reverse=True)
+                break
+
     def get_osmatch(self, osclass_obj):
         """
             This function enables NmapOSFingerprint to determine if an
@@ -298,22 +321,26 @@ class NmapOSFingerprint(object):
 
             This method will return an NmapOSMatch object matching with
             the NmapOSClass provided in parameter
-            (match is performed based on accuracy)
+            (match is performed based on accuracy: the first NmapOSMatch
+            with the same accuracy is returned)
 
             :return: NmapOSMatch object
         """
-        rval = None
         for _osmatch in self.__osmatches:
             if _osmatch.accuracy == osclass_obj.accuracy:
-                rval = _osmatch
-                break  # sorry
-        return rval
+                return _osmatch
+            if _osmatch.accuracy < osclass_obj.accuracy:
+                break
+        return None
 
     def _add_dummy_osmatch(self, osclass_obj):
         """
             This functions creates a dummy NmapOSMatch object in order to
             encapsulate an NmapOSClass object which was not matched with an
-            existing NmapOSMatch object
+            existing NmapOSMatch object. Only meant to be called from
+            __init__, which sorts the osmatches once all of them are added.
+
+            :return: the dummy NmapOSMatch object
         """
         _dname = "{0}:{1}:{2}".format(osclass_obj.type,
                                       osclass_obj.vendor,
@@ -323,22 +350,33 @@ class NmapOSFingerprint(object):
                                    'line': -1},
                        'osclasses': []}
         _dummy_osmatch = NmapOSMatch(_dummy_dict)
+        _dummy_osmatch.add_osclass(osclass_obj)
         self.__osmatches.append(_dummy_osmatch)
+        return _dummy_osmatch
 
-    @property
     def osmatches(self, min_accuracy=0):
-        _osmatches = []
+        """
+            Returns the list of NmapOSMatch objects with an accuracy
+            greater or equal to min_accuracy, sorted by descending
+            accuracy. A new list is returned on each call: modifying it
+            does not affect the NmapOSFingerprint object.
 
-        for _osmatch in self.__osmatches:
-            if _osmatch.accuracy >= min_accuracy:
-                _osmatches.append(_osmatch)
+            :param min_accuracy: minimal accuracy of the returned osmatches
+            :type min_accuracy: int
 
+            :return: list of NmapOSMatch objects
+        """
+        _osmatches = []
+        for _osmatch in self.__osmatches:
+            if _osmatch.accuracy < min_accuracy:
+                break
+            _osmatches.append(_osmatch)
         return _osmatches
 
     @property
     def osclasses(self, min_accuracy=0):
         osc_array = []
-        for _osm in self.osmatches:
+        for _osm in self.osmatches():
             for _osc in _osm.osclasses:
                 if _osc.accuracy >= min_accuracy:
                     osc_array.append(_osc)
@@ -363,38 +401,27 @@ class NmapOSFingerprint(object):
 
     def osmatch(self, min_accuracy=90):
         warnings.warn("NmapOSFingerprint.osmatch is deprecated: "
-                      "use NmapOSFingerprint.osmatches", DeprecationWarning)
-        os_array = []
-        for _osmatch in self.__osmatches:
-            if _osmatch.accuracy >= min_accuracy:
-                os_array.append(_osmatch.name)
-        return os_array
+                      "use NmapOSFingerprint.osmatches()", DeprecationWarning)
+        return [_osmatch.name for _osmatch in self.osmatches(min_accuracy)]
 
     def osclass(self, min_accuracy=90):
         warnings.warn("NmapOSFingerprint.osclass() is deprecated: "
                       "use NmapOSFingerprint.osclasses() if applicable",
                       DeprecationWarning)
-        os_array = []
-        for osmatch_entry in self.osmatches():
-            if osmatch_entry.accuracy >= min_accuracy:
-                for oclass in osmatch_entry.osclasses:
-                    _ftstr = "type:{0}|vendor:{1}|osfamily{2}".format(
-                             oclass.type,
-                             oclass.vendor,
-                             oclass.osfamily)
-                    os_array.append(_ftstr)
-        return os_array
+        return ["type:{0}|vendor:{1}|osfamily:{2}".format(oclass.type,
+                                                          oclass.vendor,
+                                                          oclass.osfamily)
+                for _osmatch in self.osmatches(min_accuracy)
+                for oclass in _osmatch.osclasses]
 
     def os_cpelist(self):
         cpelist = []
-        for _osmatch in self.osmatches:
+        for _osmatch in self.osmatches():
             for oclass in _osmatch.osclasses:
                 cpelist.extend(oclass.cpelist)
         return cpelist
 
     def __repr__(self):
-        rval = ""
-        for _osmatch in self.osmatches:
-            rval += "\r\n{0}".format(_osmatch)
-        rval += "Fingerprints: ".format(self.fingerprint)
-        return rval
+        rval = [str(_osmatch) for _osmatch in self.osmatches()]
+        rval.append("Fingerprints: {0}".format(self.fingerprint))
+        return "\r\n".join(rval)
@@ -668,20 +668,16 @@ class NmapParser(object):
             :return: Element
         """
 
-        rval = {}
         if not ET.iselement(elt_data):
             raise NmapParserException("Error while trying to parse supplied "
                                       "data attributes: format is not XML or "
                                       "XML tag is empty")
-        try:
-            for dkey in elt_data.keys():
-                rval[dkey] = elt_data.get(dkey)
-                if rval[dkey] is None:
-                    raise NmapParserException("Error while trying to build-up "
-                                              "element attributes: empty "
-                                              "attribute {0}".format(dkey))
-        except:
-            raise
+        rval = dict(elt_data.attrib)
+        if None in rval.values():
+            dkey = next(k for k, v in rval.items() if v is None)
+            raise NmapParserException("Error while trying to build-up "
+                                      "element attributes: empty "
+                                      "attribute {0}".format(dkey))
         return rval
 
 
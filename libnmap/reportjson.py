@@ -20,7 +20,10 @@ class ReportEncoder(json.JSONEncoder):
                  'NmapReport': NmapReport}
         if isinstance(obj, tuple(otype.values())):
             key = ('__{0}__').format(obj.__class__.__name__)
-            return {key: obj.__dict__}
+            if hasattr(obj, '__dict__'):
+                return {key: obj.__dict__}
+            # objects declaring __slots__ have no __dict__
+            return {key: dict((k, getattr(obj, k)) for k in obj.__slots__)}
         return json.JSONEncoder.default(self, obj)
 
 
@@ -3,7 +3,11 @@
 
 import unittest
 import os
+import json
+import warnings
 from libnmap.parser import NmapParser
+from libnmap.objects.os import NmapOSMatch, NmapOSFingerprint
+from libnmap.reportjson import ReportEncoder
 
 
 class TestNmapFP(unittest.TestCase):
@@ -55,7 +59,7 @@ class TestNmapFP(unittest.TestCase):
         j=0
         k=0
         for h in hlist:
-            for om in h.os.osmatches:
+            for om in h.os.osmatches():
                 for oc in om.osclasses:
                     tdict = {'type': oc.type, 'accuracy': oc.accuracy, 'vendor': oc.vendor, 'osfamily': oc.osfamily, 'osgen': oc.osgen}
                     self.assertEqual(oclines[i][j][k], tdict)
@@ -81,7 +85,7 @@ class TestNmapFP(unittest.TestCase):
         i=0
         j=0
         for h in hlist:
-            for om in h.os.osmatches:
+            for om in h.os.osmatches():
                 tdict = {'line': om.line, 'accuracy': om.accuracy, 'name': om.name}
                 self.assertEqual(baseline[i][j], tdict)
                 j+=1
@@ -97,10 +101,108 @@ class TestNmapFP(unittest.TestCase):
             {'line': -1, 'accuracy': 88, 'name': 'webcam:AXIS:Linux'}]
 
         j=0
-        for om in h1.os.osmatches:
+        for om in h1.os.osmatches():
             tdict = {'line': om.line, 'accuracy': om.accuracy, 'name': om.name}
             self.assertEqual(h1osmatches[j], tdict)
             j+=1
+        self.assertEqual([om.name for om in h1.os.osmatches(min_accuracy=90)],
+                         ['general purpose:Linux:Linux', 'WAP:Gemtek:embedded'])
+        # modifying the returned list does not affect the fingerprint
+        h1.os_match_probabilities().reverse()
+        self.assertEqual([om.accuracy for om in h1.os.osmatches(95)], [95])
+        self.assertEqual([om.accuracy for om in h1.os.osmatches()],
+                         [95, 90, 89, 88])
+        # orphan osclasses are attached to the dummy osmatch created for them
+        h1osclasses = [['general purpose: Linux, Linux(2.6.X)'],
+                       ['WAP: Gemtek, embedded', 'WAP: Siemens, embedded',
+                        'general purpose: Linux, Linux(2.4.X)',
+                        'WAP: Linux, Linux(2.4.X)'],
+                       ['general purpose: Nokia, Linux(2.6.X)'],
+                       ['webcam: AXIS, Linux(2.6.X)']]
+        for om, oclist in zip(h1.os.osmatches(), h1osclasses):
+            self.assertEqual([oc.description for oc in om.osclasses], oclist)
+
+    def test_osmatch_osclass_deprecated(self):
+        rep = NmapParser.parse_fromfile(self.flist_os['nv6']['file'])
+        h1 = rep.hosts.pop()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            self.assertEqual(h1.os.osmatch(), ['Apple Mac OS X 10.8 - 10.8.1 (Mountain Lion) (Darwin 12.0.0 - 12.1.0) or iOS 5.0.1'])
+            self.assertEqual(h1.os.osclass(),
+                             ['type:general purpose|vendor:Apple|osfamily:Mac OS X',
+                              'type:phone|vendor:Apple|osfamily:iOS',
+                              'type:media device|vendor:Apple|osfamily:iOS'])
+            self.assertEqual(h1.os.osclass(min_accuracy=101), [])
+
+    def test_osmatch_bad_osclass(self):
+        osmatch = {'name': 'Linux 3.X', 'line': '1', 'accuracy': '100'}
+        self.assertEqual(NmapOSMatch({'osmatch': osmatch}).osclasses, [])
+        bad_osclass = {'osclass': {'vendor': 'Linux', 'accuracy': '100'}}
+        self.assertRaises(Exception, NmapOSMatch,
+                          {'osmatch': osmatch, 'osclasses': [bad_osclass]})
+        # malformed osmatches are reported when the fingerprint is built
+        self.assertRaises(Exception, NmapOSFingerprint,
+                          {'osmatches': [{'osmatch': osmatch,
+                                          'osclasses': [bad_osclass]}]})
+        self.assertRaises(Exception, NmapOSFingerprint,
+                          {'osmatches': [{'osmatch': {'name': 'Linux 3.X',
+                                                      'accuracy': '100'}}]})
+        self.assertRaises(ValueError, NmapOSFingerprint,
+                          {'osmatches': [{'osmatch': {'name': 'Linux 3.X',
+                                                      'line': 'x',
+                                                      'accuracy': '100'}}]})
+
+    def test_osmatches_sorted(self):
+        osmatches = [{'osmatch': {'name': 'a', 'line': '1', 'accuracy': '85'}},
+                     {'osmatch': {'name': 'b', 'line': '2', 'accuracy': '95'}},
+                     {'osmatch': {'name': 'c', 'line': '3', 'accuracy': '85'}}]
+        osfp = NmapOSFingerprint({'osmatches': osmatches})
+        self.assertEqual([om.name for om in osfp.osmatches()], ['b', 'a', 'c'])
+        self.assertEqual([om.name for om in osfp.osmatches(90)], ['b'])
+        # NmapHost builds an empty fingerprint for every host without OS
+        # data: this path must stay as cheap as a plain constructor
+        # (no sorting). Benchmark with:
+        # python -m timeit -s "from libnmap.objects.os import \
+        #     NmapOSFingerprint" "NmapOSFingerprint({})"
+        self.assertEqual(NmapOSFingerprint({}).osmatches(), [])
+        for file_e in list(self.flist_os.values()) + self.flist_full:
+            rep = NmapParser.parse_fromfile(file_e['file'])
+            for _host in rep.hosts:
+                accuracies = [om.accuracy for om in _host.os.osmatches()]
+                self.assertEqual(accuracies, sorted(accuracies, reverse=True))
+                self.assertEqual(_host.os.osmatches(90),
+                                 [om for om in _host.os.osmatches()
+                                  if om.accuracy >= 90])
+
+    def test_fp_json(self):
+        rep = NmapParser.parse_fromfile(self.flist_os['nv6']['file'])
+        h1 = rep.hosts.pop()
+        jfp = json.loads(json.dumps(h1.os, cls=ReportEncoder))
+        fp = jfp['__NmapOSFingerprint__']
+        self.assertEqual(sorted(fp.keys()),
+                         ['_NmapOSFingerprint__fingerprints',
+                          '_NmapOSFingerprint__osmatches',
+                          '_NmapOSFingerprint__ports_used'])
+        self.assertEqual(fp['_NmapOSFingerprint__fingerprints'],
+                         h1.os.fingerprints)
+        self.assertEqual(len(fp['_NmapOSFingerprint__osmatches']), 1)
+        osm = fp['_NmapOSFingerprint__osmatches'][0]['__NmapOSMatch__']
+        self.assertEqual(sorted(osm.keys()),
+                         ['_accuracy', '_line', '_name', '_osclasses'])
+        self.assertEqual(osm['_line'], 6014)
+        self.assertEqual(len(osm['_osclasses']), 3)
+        osc = osm['_osclasses'][0]['__NmapOSClass__']
+        self.assertEqual(osc, {'_vendor': 'Apple', '_osfamily': 'Mac OS X',
+                               '_accuracy': 100, '_osgen': '10.8.X',
+                               '_type': 'general purpose',
+                               '_cpelist': [{'__CPE__': {
+                                   '_cpestring': 'cpe:/o:apple:mac_os_x:10.8',
+                                   '_cpedict': {'cpe': 'cpe', 'part': '/o',
+                                                'vendor': 'apple',
+                                                'product': 'mac_os_x',
+                                                'version': '10.8',
+                                                'update': '', 'edition': '',
+                                                'language': ''}}}]})
 
     def test_fpv6(self):
         fpval = "OS:SCAN(V=6.40-2%E=4%D=5/9%OT=88%CT=%CU=%PV=Y%DS=0%DC=L%G=N%TM=536BFF2F%P=x\nOS:86_64-apple-darwin10.8.0)SEQ(SP=F9%GCD=1%ISR=103%TI=RD%TS=A)OPS(O1=M3FD8\nOS:NW4NNT11SLL%O2=M3FD8NW4NNT11SLL%O3=M3FD8NW4NNT11%O4=M3FD8NW4NNT11SLL%O5=\nOS:M3FD8NW4NNT11SLL%O6=M3FD8NNT11SLL)WIN(W1=FFFF%W2=FFFF%W3=FFFF%W4=FFFF%W5\nOS:=FFFF%W6=FFFF)ECN(R=Y%DF=Y%TG=40%W=FFFF%O=M3FD8NW4SLL%CC=N%Q=)T1(R=Y%DF=\nOS:Y%TG=40%S=O%A=S+%F=AS%RD=0%Q=)T2(R=N)T3(R=N)T4(R=Y%DF=Y%TG=40%W=0%S=A%A=\nOS:Z%F=R%O=%RD=0%Q=)U1(R=N)IE(R=N)\n"
@@ -135,12 +237,18 @@ class TestNmapFP(unittest.TestCase):
         self.assertEqual(osc.osfamily, "Linux")
         self.assertEqual(osc.osgen, "3.X")
         self.assertEqual(osc.accuracy, 100)
+        self.assertEqual([c.cpestring for c in osc.cpelist],
+                         ['cpe:/o:linux:linux_kernel:3'])
+        self.assertEqual(h.os.osmatches()[0].get_cpe(),
+                         ['cpe:/o:linux:linux_kernel:3'])
 
         #<osclass type="general purpose" vendor="Linux" osfamily="Linux" osgen="3.X" accuracy="100"><cpe>cpe:/o:linux:linux_kernel:3</cpe></osclass>
         
 
 if __name__ == '__main__':
     test_suite = ['test_fp', 'test_fpv6', 'test_osmatches_new', 'test_osclasses_new',
-            'test_fpv5', 'test_osmatches_old', 'test_cpeservice', 'test_os_class_probabilities']
+            'test_fpv5', 'test_osmatches_old', 'test_cpeservice', 'test_os_class_probabilities',
+            'test_osmatch_osclass_deprecated', 'test_osmatch_bad_osclass',
+            'test_osmatches_sorted', 'test_fp_json']
     suite = unittest.TestSuite(map(TestNmapFP, test_suite))
     test_result = unittest.TextTestRunner(verbosity=2).run(suite)